@@ -3,9 +3,13 @@ Database Helper Functions
 
 MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
+
+The client is async (Motor): call connect_db() on application startup and
+close_db() on shutdown, and await the helpers from async handlers.
 """
 
-from pymongo import MongoClient
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
@@ -21,12 +25,28 @@ db = None
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
-if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+# Connection pool size for the Motor client
+MAX_POOL_SIZE = int(os.getenv("DATABASE_MAX_POOL_SIZE", 20))
+
+
+def connect_db():
+    """Create the Motor client (call from the app startup event)"""
+    global _client, db
+    if database_url and database_name:
+        _client = AsyncIOMotorClient(database_url, maxPoolSize=MAX_POOL_SIZE)
+        db = _client[database_name]
+
+
+def close_db():
+    """Close the Motor client (call from the app shutdown event)"""
+    global _client, db
+    if _client is not None:
+        _client.close()
+    _client = None
+    db = None
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -37,19 +57,21 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     else:
         data_dict = data.copy()
 
+    # Ids are generated client-side, so the id doesn't depend on the insert result
+    data_dict.setdefault('_id', ObjectId())
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
-    return str(result.inserted_id)
+    await db[collection_name].insert_one(data_dict)
+    return str(data_dict['_id'])
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None):
     """Get documents from collection"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
-    
-    cursor = db[collection_name].find(filter_dict or {})
+
+    cursor = db[collection_name].find(filter_dict or {}, projection)
     if limit:
         cursor = cursor.limit(limit)
-    
-    return list(cursor)
+
+    return [doc async for doc in cursor]
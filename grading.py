@@ -0,0 +1,85 @@
+"""
+Grading Heuristics
+
+Submission scoring used by the grading endpoints. This module has no
+FastAPI/MongoDB imports and is fully annotated so it can be compiled with
+mypyc (`mypyc grading.py`); the compiled extension is picked up by a plain
+`import grading`, otherwise the pure-Python module is used.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+# Essay correctness by length bucket: <=80, 81-200, >200 chars
+ESSAY_SCORES: Tuple[float, float, float] = (0.3, 0.6, 1.0)
+
+
+def score_question(
+    q_type: Optional[str],
+    points: int,
+    prompt: str,
+    prompt_keywords: Optional[List[str]],
+    answer_key: Any,
+    user_answer: Optional[Dict[str, Any]],
+) -> Tuple[int, float, str]:
+    """Score one question, returning (earned points, correctness, rationale)"""
+    correctness = 0.5  # default partial credit
+    rationale = "Partial credit: baseline heuristic"
+
+    if user_answer is not None:
+        if q_type == "multiple_choice":
+            if answer_key is not None and user_answer.get("answer") == answer_key:
+                correctness = 1.0
+                rationale = "Correct option"
+            else:
+                correctness = 0.0
+                rationale = "Incorrect option"
+        elif q_type == "short_answer":
+            # naive keyword match stub
+            if prompt_keywords is None:  # assessments stored before keywords were cached
+                prompt_keywords = prompt.lower().split()
+            prompt_words = set(prompt_keywords)
+            ans_words = set(str(user_answer.get("answer", "")).lower().split())
+            overlap = len(prompt_words & ans_words)
+            correctness = min(1.0, overlap / 5.0)
+            rationale = f"Keyword overlap score: {overlap}"
+        elif q_type == "essay":
+            # length-based stub
+            length = len(str(user_answer.get("answer", "")))
+            correctness = ESSAY_SCORES[(length > 80) + (length > 200)]
+            rationale = f"Length heuristic: {length} chars"
+
+    return round(points * correctness), correctness, rationale
+
+
+def grade_answers(
+    questions: List[Dict[str, Any]],
+    answers: List[Dict[str, Any]],
+    total_points: int,
+) -> Tuple[float, List[Dict[str, Any]]]:
+    """Grade one submission's answers, returning (score percentage, per-question feedback)"""
+    # Index answers once; reversed so the first answer for an index wins
+    ans_by_idx = {a.get("question_index"): a for a in reversed(answers)}
+
+    feedback: List[Dict[str, Any]] = []
+    earned = 0
+    for i, q in enumerate(questions):
+        pts = int(q.get("points", 1))
+        earned_q, correctness, rationale = score_question(
+            q.get("type"),
+            pts,
+            str(q.get("prompt", "")),
+            q.get("_prompt_keywords"),
+            q.get("answer_key"),
+            ans_by_idx.get(i),
+        )
+        earned += earned_q
+        feedback.append({
+            "question_index": i,
+            "points": pts,
+            "earned": earned_q,
+            "correctness": round(correctness, 2),
+            "feedback": rationale,
+        })
+
+    score = round((earned / total_points) * 100.0, 2) if total_points > 0 else 0.0
+    return score, feedback
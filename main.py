@@ -1,13 +1,26 @@
+import asyncio
+import logging
 import os
 from typing import List, Optional, Any, Dict
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from bson import ObjectId
+from bson.errors import InvalidId
+from cachetools import TTLCache
+from fastapi import Depends, FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse, Response
+from pymongo import UpdateOne
+from pydantic import BaseModel, Field, field_validator
 
-from database import db, create_document, get_documents
+import orjson
 
-app = FastAPI(title="ExamAi API", version="0.1.0")
+import database
+from database import create_document, get_documents
+from grading import grade_answers
+
+logger = logging.getLogger(__name__)
+
+app = FastAPI(title="ExamAi API", version="0.1.0", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,6 +31,35 @@ app.add_middleware(
 )
 
 
+# Background index build; held so the task isn't garbage-collected mid-run
+_index_task: Optional[asyncio.Task] = None
+
+
+async def ensure_indexes():
+    # _id lookups are indexed by default; submissions are also filtered by assessment
+    try:
+        await database.db["submission"].create_index("assessment_id")
+    except Exception as e:
+        logger.warning("Could not create indexes: %s", e)
+
+
+@app.on_event("startup")
+async def startup_db_client():
+    global _index_task
+    database.connect_db()
+    if database.db is not None:
+        # Don't block boot on an unreachable database (server selection can take 30s);
+        # /test reports the connection state
+        _index_task = asyncio.create_task(ensure_indexes())
+
+
+@app.on_event("shutdown")
+async def shutdown_db_client():
+    if _index_task is not None and not _index_task.done():
+        _index_task.cancel()
+    database.close_db()
+
+
 # -----------------------
 # Utility
 # -----------------------
@@ -25,20 +67,93 @@ app.add_middleware(
 def serialize_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
     if not doc:
         return doc
-    d = dict(doc)
-    if "_id" in d:
-        d["id"] = str(d.pop("_id"))
-    # Convert nested ObjectIds if any exist in simple arrays (best-effort)
-    for k, v in list(d.items()):
-        try:
-            from bson import ObjectId  # type: ignore
-            if isinstance(v, ObjectId):
-                d[k] = str(v)
-            if isinstance(v, list):
-                d[k] = [str(x) if isinstance(x, ObjectId) else x for x in v]
-        except Exception:
-            pass
-    return d
+    # Single pass: rename _id and stringify ObjectIds (also inside simple arrays)
+    out: Dict[str, Any] = {}
+    for k, v in doc.items():
+        if k == "_id":
+            out["id"] = str(v)
+        elif isinstance(v, ObjectId):
+            out[k] = str(v)
+        elif isinstance(v, list):
+            out[k] = [str(x) if isinstance(x, ObjectId) else x for x in v]
+        else:
+            out[k] = v
+    return out
+
+
+def precompute_grading_fields(data: Dict[str, Any]) -> None:
+    """Store values grading needs on a new assessment so they aren't recomputed per submission"""
+    data["total_points"] = sum(int(q.get("points", 1)) for q in data["questions"])
+    for q in data["questions"]:
+        if q.get("type") == "short_answer":
+            q["_prompt_keywords"] = list(set(str(q.get("prompt", "")).lower().split()))
+
+
+def serialize_assessment(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """serialize_doc without the grading-only fields added by precompute_grading_fields"""
+    # Build new dicts; doc may be the cached copy that grading still reads from
+    out = serialize_doc(doc)
+    out.pop("total_points", None)
+    out["questions"] = [
+        {k: v for k, v in q.items() if k != "_prompt_keywords"}
+        for q in out.get("questions", [])
+    ]
+    return out
+
+
+def parse_object_id(value: str) -> ObjectId:
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise HTTPException(status_code=422, detail=f"Invalid id: {value}")
+
+
+# Path/query dependencies: parse the id once at the request boundary. They are
+# async so FastAPI runs them on the event loop instead of the thread pool.
+async def assessment_object_id(assessment_id: str) -> ObjectId:
+    return parse_object_id(assessment_id)
+
+
+async def submission_object_id(submission_id: str) -> ObjectId:
+    return parse_object_id(submission_id)
+
+
+# Recently read assessments, keyed by id. Questions are immutable after
+# creation, so a short TTL is safe; drop entries here if an update endpoint is added.
+_assessment_cache: TTLCache = TTLCache(maxsize=256, ttl=60)
+
+
+async def find_assessment(assessment_id: ObjectId) -> Optional[Dict[str, Any]]:
+    doc = _assessment_cache.get(assessment_id)
+    if doc is None:
+        doc = await database.db["assessment"].find_one({"_id": assessment_id})
+        if doc is not None:
+            _assessment_cache[assessment_id] = doc
+    return doc
+
+
+def assessment_total_points(assessment: Dict[str, Any]) -> int:
+    total_points = assessment.get("total_points")
+    if total_points is None:  # assessments stored before total_points was cached
+        total_points = sum(int(q.get("points", 1)) for q in assessment.get("questions", []))
+    return total_points
+
+
+def json_list_response(docs: List[Dict[str, Any]]) -> Response:
+    """Encode serialized documents straight to JSON bytes, bypassing jsonable_encoder"""
+    # default=str covers ObjectIds nested deeper than serialize_doc handles
+    body = orjson.dumps([serialize_doc(d) for d in docs], default=str)
+    return Response(content=body, media_type="application/json")
+
+
+# Max grading updates held in memory before batch-grade writes them out
+BATCH_GRADE_WRITE_SIZE = 500
+
+
+# Listing views only need summary fields; skip the large questions /
+# content_blocks arrays
+ASSESSMENT_LIST_PROJECTION = {"title": 1, "description": 1, "source_type": 1}
+LESSON_LIST_PROJECTION = {"title": 1, "description": 1}
 
 
 # -----------------------
@@ -75,6 +190,13 @@ class SubmissionCreate(BaseModel):
     student_name: Optional[str] = None
     answers: List[SubmissionAnswer]
 
+    @field_validator("assessment_id")
+    @classmethod
+    def check_assessment_id(cls, v: str) -> str:
+        if not ObjectId.is_valid(v):
+            raise ValueError("must be a valid ObjectId")
+        return v
+
 
 class GradeResult(BaseModel):
     graded: bool
@@ -83,6 +205,12 @@ class GradeResult(BaseModel):
     feedback: List[Dict[str, Any]]
 
 
+class BatchGradeResult(BaseModel):
+    submission_id: str
+    total_points: int
+    score: float
+
+
 class LessonBlock(BaseModel):
     kind: str  # text | quiz | image | video
     content: Dict[str, Any]
@@ -98,27 +226,36 @@ class LessonCreate(BaseModel):
 # Root + Health
 # -----------------------
 
+# Health-check payloads are static apart from the live database fields, so
+# build them once. The root body is pre-encoded; a fresh Response is still
+# returned per request since middleware mutates response headers in place.
+ROOT_RESPONSE_BODY = orjson.dumps({"message": "ExamAi Backend running"})
+
+TEST_INFO_TEMPLATE = {
+    "backend": "✅ Running",
+    "database": "❌ Not Available",
+    "database_url": "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set",
+    "database_name": "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set",
+    "connection_status": "Not Connected",
+    "collections": [],
+}
+
+
 @app.get("/")
-def read_root():
-    return {"message": "ExamAi Backend running"}
+async def read_root():
+    return Response(content=ROOT_RESPONSE_BODY, media_type="application/json")
 
 
 @app.get("/test")
-def test_database():
-    info = {
-        "backend": "✅ Running",
-        "database": "❌ Not Available",
-        "database_url": "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set",
-        "database_name": "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set",
-        "connection_status": "Not Connected",
-        "collections": [],
-    }
+async def test_database():
+    info = TEST_INFO_TEMPLATE.copy()
     try:
+        db = database.db
         if db is not None:
             info["database"] = "✅ Connected"
             info["connection_status"] = "Connected"
             try:
-                info["collections"] = db.list_collection_names()
+                info["collections"] = await db.list_collection_names()
                 info["database"] = "✅ Connected & Working"
             except Exception as e:
                 info["database"] = f"⚠️ Connected but error: {str(e)[:60]}"
@@ -132,31 +269,30 @@ def test_database():
 # -----------------------
 
 @app.post("/assessments", response_model=Assessment)
-def create_assessment(payload: AssessmentCreate):
-    data = payload.dict()
-    inserted_id = create_document("assessment", data)
-    # Fetch created to return
-    doc = db["assessment"].find_one({"_id": __import__("bson").ObjectId(inserted_id)}) if hasattr(__import__("bson"), "ObjectId") else None
-    return Assessment(id=inserted_id, **data)
+async def create_assessment(payload: AssessmentCreate):
+    data = payload.model_dump()
+    precompute_grading_fields(data)
+    inserted_id = await create_document("assessment", data)
+    # payload is already validated; skip re-validating every question
+    return Assessment.model_construct(id=inserted_id, **dict(payload))
 
 
 @app.get("/assessments")
-def list_assessments():
-    docs = get_documents("assessment")
-    return [serialize_doc(d) for d in docs]
+async def list_assessments():
+    docs = await get_documents("assessment", projection=ASSESSMENT_LIST_PROJECTION)
+    return json_list_response(docs)
 
 
 @app.get("/assessments/{assessment_id}")
-def get_assessment(assessment_id: str):
-    from bson import ObjectId  # type: ignore
-    doc = db["assessment"].find_one({"_id": ObjectId(assessment_id)})
+async def get_assessment(assessment_id: ObjectId = Depends(assessment_object_id)):
+    doc = await find_assessment(assessment_id)
     if not doc:
         raise HTTPException(status_code=404, detail="Assessment not found")
-    return serialize_doc(doc)
+    return serialize_assessment(doc)
 
 
 @app.post("/assessments/from-upload", response_model=Assessment)
-def create_assessment_from_upload(
+async def create_assessment_from_upload(
     title: str = "Generated Assessment",
     description: str = "Generated from uploaded source",
     source_type: str = "file",
@@ -190,8 +326,11 @@ def create_assessment_from_upload(
         source_reference=filename,
         questions=fake_questions,
     )
-    inserted_id = create_document("assessment", payload.dict())
-    return Assessment(id=inserted_id, **payload.dict())
+    data = payload.model_dump()
+    precompute_grading_fields(data)
+    inserted_id = await create_document("assessment", data)
+    # payload is already validated; skip re-validating every question
+    return Assessment.model_construct(id=inserted_id, **dict(payload))
 
 
 # -----------------------
@@ -199,77 +338,72 @@ def create_assessment_from_upload(
 # -----------------------
 
 @app.post("/submissions", response_model=Dict[str, Any])
-def create_submission(payload: SubmissionCreate):
+async def create_submission(payload: SubmissionCreate):
     # Basic validation: ensure assessment exists and answers align
-    from bson import ObjectId  # type: ignore
-    assessment = db["assessment"].find_one({"_id": ObjectId(payload.assessment_id)})
+    assessment = await find_assessment(ObjectId(payload.assessment_id))
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found")
 
-    data = payload.dict()
-    inserted_id = create_document("submission", data)
+    data = payload.model_dump()
+    inserted_id = await create_document("submission", data)
     return {"id": inserted_id, **data}
 
 
+@app.post("/submissions/batch-grade", response_model=List[BatchGradeResult])
+async def batch_grade_submissions(
+    assessment_id: ObjectId = Depends(assessment_object_id),
+    regrade: bool = False,
+):
+    assessment = await find_assessment(assessment_id)
+    if not assessment:
+        raise HTTPException(status_code=404, detail="Assessment not found")
+
+    questions: List[Dict[str, Any]] = assessment.get("questions", [])
+    total_points = assessment_total_points(assessment)
+
+    # Submissions store assessment_id as a string
+    query: Dict[str, Any] = {"assessment_id": str(assessment_id)}
+    if not regrade:
+        query["graded"] = {"$ne": True}
+
+    results: List[BatchGradeResult] = []
+    updates: List[UpdateOne] = []
+    cursor = database.db["submission"].find(query, {"answers": 1})
+    async for sub in cursor:
+        score, feedback = grade_answers(questions, sub.get("answers", []), total_points)
+        updates.append(UpdateOne(
+            {"_id": sub["_id"]},
+            {"$set": {"graded": True, "total_points": total_points, "score": score, "feedback": feedback}},
+        ))
+        results.append(BatchGradeResult(submission_id=str(sub["_id"]), total_points=total_points, score=score))
+        # Flush in batches so pending feedback doesn't grow with the submission count
+        if len(updates) >= BATCH_GRADE_WRITE_SIZE:
+            await database.db["submission"].bulk_write(updates, ordered=False)
+            updates = []
+
+    if updates:
+        await database.db["submission"].bulk_write(updates, ordered=False)
+
+    return results
+
+
 @app.post("/submissions/{submission_id}/grade", response_model=GradeResult)
-def grade_submission(submission_id: str):
-    from bson import ObjectId  # type: ignore
-    sub = db["submission"].find_one({"_id": ObjectId(submission_id)})
+async def grade_submission(submission_id: ObjectId = Depends(submission_object_id)):
+    sub = await database.db["submission"].find_one({"_id": submission_id})
     if not sub:
         raise HTTPException(status_code=404, detail="Submission not found")
 
-    assessment = db["assessment"].find_one({"_id": ObjectId(sub["assessment_id"])})
+    # Usually served from the cache when many submissions of one exam are graded
+    assessment = await find_assessment(ObjectId(sub["assessment_id"]))
     if not assessment:
         raise HTTPException(status_code=404, detail="Assessment not found for submission")
 
-    questions: List[Dict[str, Any]] = assessment.get("questions", [])
-    answers: List[Dict[str, Any]] = sub.get("answers", [])
-
-    total_points = sum(int(q.get("points", 1)) for q in questions)
-
-    feedback: List[Dict[str, Any]] = []
-    earned = 0
-    for i, q in enumerate(questions):
-        user_ans = next((a for a in answers if a.get("question_index") == i), None)
-        correctness = 0.5  # default partial credit
-        rationale = "Partial credit: baseline heuristic"
-
-        if user_ans is not None:
-            if q.get("type") == "multiple_choice":
-                key = q.get("answer_key")
-                if key is not None and user_ans.get("answer") == key:
-                    correctness = 1.0
-                    rationale = "Correct option"
-                else:
-                    correctness = 0.0
-                    rationale = "Incorrect option"
-            elif q.get("type") == "short_answer":
-                # naive keyword match stub
-                prompt_words = set(str(q.get("prompt", "")).lower().split())
-                ans_words = set(str(user_ans.get("answer", "")).lower().split())
-                overlap = len(prompt_words & ans_words)
-                correctness = min(1.0, overlap / 5.0)
-                rationale = f"Keyword overlap score: {overlap}"
-            elif q.get("type") == "essay":
-                # length-based stub
-                length = len(str(user_ans.get("answer", "")))
-                correctness = 1.0 if length > 200 else 0.6 if length > 80 else 0.3
-                rationale = f"Length heuristic: {length} chars"
-        pts = int(q.get("points", 1))
-        earned += round(pts * correctness)
-        feedback.append({
-            "question_index": i,
-            "points": pts,
-            "earned": round(pts * correctness),
-            "correctness": round(correctness, 2),
-            "feedback": rationale,
-        })
-
-    score = round((earned / total_points) * 100.0, 2) if total_points > 0 else 0.0
+    total_points = assessment_total_points(assessment)
+    score, feedback = grade_answers(assessment.get("questions", []), sub.get("answers", []), total_points)
 
     # Persist grading result to submission
-    db["submission"].update_one(
-        {"_id": ObjectId(submission_id)},
+    await database.db["submission"].update_one(
+        {"_id": submission_id},
         {"$set": {"graded": True, "total_points": total_points, "score": score, "feedback": feedback}},
     )
 
@@ -281,15 +415,16 @@ def grade_submission(submission_id: str):
 # -----------------------
 
 @app.post("/lessons")
-def create_lesson(payload: LessonCreate):
-    inserted_id = create_document("lesson", payload.dict())
-    return {"id": inserted_id, **payload.dict()}
+async def create_lesson(payload: LessonCreate):
+    data = payload.model_dump()
+    inserted_id = await create_document("lesson", data)
+    return {"id": inserted_id, **data}
 
 
 @app.get("/lessons")
-def list_lessons():
-    docs = get_documents("lesson")
-    return [serialize_doc(d) for d in docs]
+async def list_lessons():
+    docs = await get_documents("lesson", projection=LESSON_LIST_PROJECTION)
+    return json_list_response(docs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,100 @@
+import pytest
+from bson import ObjectId
+
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient  # noqa: E402
+
+import database  # noqa: E402
+import main  # noqa: E402
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = iter(docs)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._docs)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for the batch-grade path"""
+
+    def __init__(self, docs=()):
+        self.docs = list(docs)
+        self.bulk_writes = []
+
+    async def find_one(self, query):
+        return next((d for d in self.docs if d["_id"] == query["_id"]), None)
+
+    def find(self, query, projection=None):
+        def matches(doc):
+            for k, v in query.items():
+                if isinstance(v, dict) and "$ne" in v:
+                    if doc.get(k) == v["$ne"]:
+                        return False
+                elif doc.get(k) != v:
+                    return False
+            return True
+        return FakeCursor([d for d in self.docs if matches(d)])
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_writes.append(ops)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    assessment_id = ObjectId()
+    assessment = {
+        "_id": assessment_id,
+        "questions": [{"type": "essay", "points": 10}],
+        "total_points": 10,
+    }
+    submissions = [
+        {"_id": ObjectId(), "assessment_id": str(assessment_id), "answers": [{"question_index": 0, "answer": "x" * 300}]},
+        {"_id": ObjectId(), "assessment_id": str(assessment_id), "answers": [{"question_index": 0, "answer": "x" * 100}]},
+        {"_id": ObjectId(), "assessment_id": str(assessment_id), "answers": [], "graded": True},
+        {"_id": ObjectId(), "assessment_id": str(ObjectId()), "answers": []},
+    ]
+    db = {"assessment": FakeCollection([assessment]), "submission": FakeCollection(submissions)}
+    monkeypatch.setattr(database, "db", db)
+    main._assessment_cache.clear()
+    return db, assessment_id
+
+
+def test_batch_grade_skips_graded_submissions(fake_db):
+    db, assessment_id = fake_db
+    resp = TestClient(main.app).post("/submissions/batch-grade", params={"assessment_id": str(assessment_id)})
+    assert resp.status_code == 200
+    assert [r["score"] for r in resp.json()] == [100.0, 60.0]
+    assert [len(ops) for ops in db["submission"].bulk_writes] == [2]
+
+
+def test_batch_grade_regrade_includes_graded(fake_db):
+    db, assessment_id = fake_db
+    resp = TestClient(main.app).post(
+        "/submissions/batch-grade", params={"assessment_id": str(assessment_id), "regrade": True}
+    )
+    assert len(resp.json()) == 3
+
+
+def test_batch_grade_flushes_writes_in_chunks(fake_db, monkeypatch):
+    db, assessment_id = fake_db
+    monkeypatch.setattr(main, "BATCH_GRADE_WRITE_SIZE", 2)
+    TestClient(main.app).post("/submissions/batch-grade", params={"assessment_id": str(assessment_id), "regrade": True})
+    assert [len(ops) for ops in db["submission"].bulk_writes] == [2, 1]
+
+
+def test_batch_grade_rejects_bad_id(fake_db):
+    resp = TestClient(main.app).post("/submissions/batch-grade", params={"assessment_id": "nope"})
+    assert resp.status_code == 422
+
+
+def test_batch_grade_unknown_assessment(fake_db):
+    resp = TestClient(main.app).post("/submissions/batch-grade", params={"assessment_id": str(ObjectId())})
+    assert resp.status_code == 404
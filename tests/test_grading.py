@@ -0,0 +1,51 @@
+from grading import ESSAY_SCORES, grade_answers, score_question
+
+
+def essay(length):
+    return score_question("essay", 10, "", None, None, {"answer": "x" * length})
+
+
+def test_essay_bucket_boundaries():
+    assert essay(0)[1] == ESSAY_SCORES[0] == 0.3
+    assert essay(80)[1] == 0.3
+    assert essay(81)[1] == 0.6
+    assert essay(200)[1] == 0.6
+    assert essay(201)[1] == 1.0
+
+
+def test_essay_earned_points():
+    assert essay(80)[0] == 3
+    assert essay(81)[0] == 6
+    assert essay(201)[0] == 10
+
+
+def test_unanswered_question_gets_partial_credit():
+    assert score_question("essay", 4, "", None, None, None) == (2, 0.5, "Partial credit: baseline heuristic")
+
+
+def test_short_answer_uses_cached_keywords_or_prompt():
+    answer = {"answer": "The water cycle"}
+    cached = score_question("short_answer", 5, "ignored", ["water", "cycle"], None, answer)
+    fallback = score_question("short_answer", 5, "Explain the water cycle", None, None, answer)
+    assert cached[1] == 0.4
+    assert fallback[1] == 0.6
+
+
+def test_grade_answers_scores_and_feedback():
+    questions = [
+        {"type": "multiple_choice", "answer_key": 1, "points": 3},
+        {"type": "essay", "points": 10},
+    ]
+    answers = [
+        {"question_index": 0, "answer": 1},
+        {"question_index": 0, "answer": 2},  # later duplicate is ignored
+        {"question_index": 1, "answer": "x" * 100},
+    ]
+    score, feedback = grade_answers(questions, answers, 13)
+    assert [f["earned"] for f in feedback] == [3, 6]
+    assert feedback[0]["feedback"] == "Correct option"
+    assert score == round(9 / 13 * 100, 2)
+
+
+def test_grade_answers_zero_total_points():
+    assert grade_answers([], [], 0) == (0.0, [])